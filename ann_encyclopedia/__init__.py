@@ -0,0 +1,4 @@
+import time
+
+# Reference point for the `--import-time` report, taken before any dependency is imported
+STARTED_AT = time.perf_counter()
@@ -0,0 +1,10 @@
+from ann_encyclopedia.cli import cli
+
+if __name__ == "__main__":
+    """
+    A command-line utility for retrieving Anime News Network reports and encyclopedia entries.
+
+    Documentation: https://github.com/ToshY/anime-news-network-encyclopedia
+    """
+
+    cli()
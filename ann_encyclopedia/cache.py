@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import click
+from loguru import logger
+
+from ann_encyclopedia.files import get_id_sort_key
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes the URL so requests for the same resources share a cache key.
+
+    Query parameters are sorted and the ids of the `title` parameter (e.g. `title=3/1/2`) are sorted and deduplicated.
+    """
+
+    parts = urlsplit(url)
+    query = []
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key == "title":
+            value = "/".join(sorted(set(value.split("/")), key=get_id_sort_key))
+        query.append((key, value))
+
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path,
+            urlencode(sorted(query), safe="/"),
+            "",
+        )
+    )
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of raw API responses.
+
+    Responses are stored once per content hash in `objects/`, while `index.json` maps the normalized request URLs to
+    their response. Entries older than the TTL are evicted, after which the least recently used entries are evicted
+    until the cache fits the maximum size. In offline mode, only cached responses are used (regardless of their age).
+    """
+
+    def __init__(self, directory: Path, ttl: int, max_size: int, offline: bool = False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self.index_path = directory / "index.json"
+        self.objects_directory = directory / "objects"
+        self.objects_directory.mkdir(parents=True, exist_ok=True)
+        self.index = self._read_index()
+        self.changed = False
+
+    def _read_index(self) -> dict:
+        if not self.index_path.is_file():
+            return {}
+
+        try:
+            with open(self.index_path, "r", encoding="utf8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logger.warning(
+                f"Could not decode cache index `{self.index_path}`. Starting with an empty cache."
+            )
+            return {}
+
+    def _save_index(self):
+        temp_index_path = self.index_path.with_name(f".index.json.{os.getpid()}.tmp")
+        with open(temp_index_path, "w", encoding="utf8") as f:
+            json.dump(self.index, f, sort_keys=True, indent=4)
+
+        os.replace(temp_index_path, self.index_path)
+
+    def save(self):
+        """
+        Saves the index if it changed since it was last saved.
+        """
+
+        if not self.changed:
+            return
+
+        self._save_index()
+        self.changed = False
+
+    def _get_object_path(self, content_hash: str) -> Path:
+        return self.objects_directory / content_hash[:2] / content_hash
+
+    def get(self, url: str) -> bytes | None:
+        key = normalize_url(url)
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+
+        if not self.offline and time.time() - entry["fetched_at"] > self.ttl:
+            return None
+
+        object_path = self._get_object_path(entry["object"])
+        if not object_path.is_file():
+            return None
+
+        # The access time is only saved with the next change or at the end of the run, see `save`
+        entry["accessed_at"] = time.time()
+        self.changed = True
+        logger.info(f"Using cached response for URL `{key}`.")
+
+        return object_path.read_bytes()
+
+    def set(self, url: str, content: bytes):
+        content_hash = hashlib.sha256(content).hexdigest()
+        object_path = self._get_object_path(content_hash)
+        if not object_path.is_file():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_object_path = object_path.with_name(
+                f".{content_hash}.{os.getpid()}.tmp"
+            )
+            temp_object_path.write_bytes(content)
+            os.replace(temp_object_path, object_path)
+
+        current_time = time.time()
+        self.index[normalize_url(url)] = {
+            "object": content_hash,
+            "size": len(content),
+            "fetched_at": current_time,
+            "accessed_at": current_time,
+        }
+        self._prune()
+        self.changed = True
+        self.save()
+
+    def get_or_fetch(self, url: str, fetch: Callable[[], bytes]) -> bytes:
+        content = self.get(url)
+        if content is not None:
+            return content
+
+        if self.offline:
+            raise Exception(
+                f"No cached response for URL `{normalize_url(url)}` available in offline mode."
+            )
+
+        content = fetch()
+        self.set(url, content)
+
+        return content
+
+    def items(self, path: str | None = None) -> Iterator[tuple[str, float, bytes]]:
+        """
+        Yields the cached `(url, fetched_at, content)` tuples, optionally only for the URL path, ordered from oldest
+        to newest. The content is read one response at a time.
+        """
+
+        for key, entry in sorted(
+            self.index.items(), key=lambda item: item[1]["fetched_at"]
+        ):
+            if path is not None and urlsplit(key).path != path:
+                continue
+
+            object_path = self._get_object_path(entry["object"])
+            if object_path.is_file():
+                yield key, entry["fetched_at"], object_path.read_bytes()
+
+    def _prune(self):
+        expired_before = time.time() - self.ttl
+        for key in [
+            key
+            for key, entry in self.index.items()
+            if entry["fetched_at"] < expired_before
+        ]:
+            del self.index[key]
+
+        # Identical responses share an object, so only count each object once
+        object_sizes = {entry["object"]: entry["size"] for entry in self.index.values()}
+        total_size = sum(object_sizes.values())
+        for key, entry in sorted(
+            self.index.items(), key=lambda item: item[1]["accessed_at"]
+        ):
+            if total_size <= self.max_size:
+                break
+
+            del self.index[key]
+            if all(
+                other_entry["object"] != entry["object"]
+                for other_entry in self.index.values()
+            ):
+                total_size -= entry["size"]
+
+        referenced_objects = {entry["object"] for entry in self.index.values()}
+        for object_path in self.objects_directory.glob("*/*"):
+            # Skip temporary files of responses that are still being written
+            if object_path.name.startswith("."):
+                continue
+
+            if object_path.name not in referenced_objects:
+                object_path.unlink(missing_ok=True)
+
+
+def get_response_cache(
+    cache_directory: str | None, cache_ttl: int, cache_max_size: int, offline: bool
+) -> ResponseCache | None:
+    if cache_directory is None:
+        if offline:
+            raise click.UsageError(
+                "Offline mode requires a cache directory (`--cache-directory` or `ANN_CACHE_DIRECTORY`)."
+            )
+
+        return None
+
+    cache = ResponseCache(
+        Path(cache_directory), cache_ttl, cache_max_size * 1024 * 1024, offline
+    )
+
+    # Save the access times of cached responses once, when the command finishes
+    click.get_current_context().call_on_close(cache.save)
+
+    return cache
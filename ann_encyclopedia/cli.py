@@ -0,0 +1,84 @@
+import sys
+import time
+from functools import partial
+from importlib import import_module
+
+import click
+
+from ann_encyclopedia import STARTED_AT
+
+# Subcommands mapped to `<module>:<attribute>`, imported only when invoked
+LAZY_COMMANDS = {
+    "report": "report_updater.cli:cli",
+    "encyclopedia": "encyclopedia_updater.cli:update",
+    "plan": "encyclopedia_updater.cli:plan",
+    "verify": "encyclopedia_updater.cli:verify",
+    "rehash": "encyclopedia_updater.cli:rehash",
+    "delta": "ann_encyclopedia.delta:delta",
+}
+
+# Third-party dependencies reported by `--import-time`
+TRACKED_DEPENDENCIES = ("click", "loguru", "requests", "rich")
+
+
+class LazyGroup(click.Group):
+    """
+    Group that only imports the module of a subcommand (and its dependencies) when it is resolved.
+    """
+
+    def __init__(self, *args, lazy_commands: dict[str, str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+        self.import_times: dict[str, float] = {}
+
+    def list_commands(self, ctx):
+        return sorted([*super().list_commands(ctx), *self.lazy_commands])
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+
+        module_name, attribute_name = self.lazy_commands[cmd_name].split(":")
+        if module_name not in sys.modules:
+            started_at = time.perf_counter()
+            import_module(module_name)
+            self.import_times[module_name] = time.perf_counter() - started_at
+
+        return getattr(sys.modules[module_name], attribute_name)
+
+
+def _report_import_time(group: LazyGroup, ready_at: float):
+    click.echo(f"Startup: {(ready_at - STARTED_AT) * 1000:.1f} ms", err=True)
+    for module_name, import_time in group.import_times.items():
+        click.echo(f"Import `{module_name}`: {import_time * 1000:.1f} ms", err=True)
+    click.echo(
+        f"Total: {(time.perf_counter() - STARTED_AT) * 1000:.1f} ms",
+        err=True,
+    )
+
+    loaded_dependencies = [name for name in TRACKED_DEPENDENCIES if name in sys.modules]
+    click.echo(f"Loaded dependencies: {', '.join(loaded_dependencies)}", err=True)
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_commands=LAZY_COMMANDS,
+    context_settings={"help_option_names": ["-h", "--help"]},
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
+@click.option(
+    "--import-time",
+    is_flag=True,
+    default=False,
+    help="Report the time spent on startup and imports on exit.",
+)
+@click.pass_context
+def cli(ctx, import_time):
+    """
+    Retrieve Anime News Network reports and encyclopedia entries.
+    """
+
+    if import_time:
+        ctx.call_on_close(
+            partial(_report_import_time, ctx.command, time.perf_counter())
+        )
@@ -0,0 +1,482 @@
+import hashlib
+import io
+import json
+import re
+import subprocess as sp
+import tarfile
+from pathlib import Path
+
+import click
+from loguru import logger
+
+from ann_encyclopedia.files import write_json_file
+
+ENCYCLOPEDIA_PATH_PATTERN = re.compile(
+    r"^encyclopedia/(?P<category>[a-z]+)/(?P<id>\d+)\.json$"
+)
+REPORT_PATH_PATTERN = re.compile(r"^reports/(?P<category>[a-z]+)/report\.json$")
+
+
+def _compact_json(data) -> bytes:
+    return json.dumps(
+        data, sort_keys=False, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def _get_hash(data) -> str:
+    return hashlib.sha256(_compact_json(data)).hexdigest()
+
+
+def _run_git(repository_directory: Path, arguments: list[str], input_data=None):
+    response = sp.run(
+        ["git", "-C", str(repository_directory), *arguments],
+        input=input_data,
+        capture_output=True,
+    )
+    if response.returncode != 0:
+        raise Exception(
+            f"An error occurred ({response.returncode}) while running `git {' '.join(arguments)}`: {response.stderr.decode('utf-8', errors='replace')}."
+        )
+
+    return response.stdout
+
+
+def _resolve_revision(repository_directory: Path, revision: str) -> str:
+    return (
+        _run_git(
+            repository_directory, ["rev-parse", "--verify", f"{revision}^{{commit}}"]
+        )
+        .decode("utf-8")
+        .strip()
+    )
+
+
+def _get_changed_files(
+    repository_directory: Path, from_revision: str, to_revision: str
+) -> list[tuple[str, str]]:
+    """
+    Returns the `(status, path)` pairs of encyclopedia entries and reports changed between both revisions.
+    """
+
+    output = _run_git(
+        repository_directory,
+        [
+            "diff",
+            "--name-status",
+            "--no-renames",
+            "-z",
+            from_revision,
+            to_revision,
+            "--",
+            "encyclopedia",
+            "reports",
+        ],
+    ).decode("utf-8")
+
+    fields = output.split("\0")[:-1]
+
+    return list(zip(fields[0::2], fields[1::2]))
+
+
+def _read_git_files(
+    repository_directory: Path, revision: str, paths: list[str]
+) -> dict[str, bytes]:
+    """
+    Reads the contents of multiple files at the given revision with a single `git cat-file --batch` process.
+    """
+
+    if not paths:
+        return {}
+
+    output = _run_git(
+        repository_directory,
+        ["cat-file", "--batch"],
+        "".join(f"{revision}:{path}\n" for path in paths).encode("utf-8"),
+    )
+
+    contents = {}
+    offset = 0
+    for path in paths:
+        header_end = output.index(b"\n", offset)
+        header = output[offset:header_end].decode("utf-8")
+        if header.endswith(" missing"):
+            raise FileNotFoundError(f"File `{path}` not found at `{revision}`.")
+
+        size = int(header.rsplit(" ", 1)[1])
+        contents[path] = output[header_end + 1 : header_end + 1 + size]
+        offset = header_end + 1 + size + 1
+
+    return contents
+
+
+def _get_report_delta(old_report: list, new_report: list):
+    """
+    Returns the items added, changed and removed between both reports.
+
+    New items are prepended by `_apply_report_delta`, matching the order of the reports. The full order of ids is only
+    included when that does not reproduce the new report.
+    """
+
+    old_ids = [item["id"] for item in old_report]
+    new_ids = [item["id"] for item in new_report]
+    if len(set(old_ids)) != len(old_ids) or len(set(new_ids)) != len(new_ids):
+        return {"full": new_report}
+
+    old_items = {item["id"]: item for item in old_report}
+    new_id_set = set(new_ids)
+    report_delta = {
+        "upserted": [item for item in new_report if old_items.get(item["id"]) != item],
+        "removed": [item_id for item_id in old_ids if item_id not in new_id_set],
+        "order": None,
+    }
+    if _apply_report_delta(old_report, report_delta) != new_report:
+        report_delta["order"] = new_ids
+
+    return report_delta
+
+
+def _apply_report_delta(report: list, report_delta) -> list:
+    if "full" in report_delta:
+        return report_delta["full"]
+
+    removed_ids = set(report_delta["removed"])
+    upserted_items = {item["id"]: item for item in report_delta["upserted"]}
+    existing_ids = {item["id"] for item in report}
+
+    result = [
+        item for item in report_delta["upserted"] if item["id"] not in existing_ids
+    ] + [
+        upserted_items.get(item["id"], item)
+        for item in report
+        if item["id"] not in removed_ids
+    ]
+
+    if report_delta["order"] is not None:
+        items = {item["id"]: item for item in result}
+        result = [items[item_id] for item_id in report_delta["order"]]
+
+    return result
+
+
+def _add_tar_member(archive: tarfile.TarFile, name: str, contents: bytes):
+    member = tarfile.TarInfo(name)
+    member.size = len(contents)
+    archive.addfile(member, io.BytesIO(contents))
+
+
+def _read_tar_member(archive: tarfile.TarFile, name: str):
+    member = archive.extractfile(name)
+    if member is None:
+        raise FileNotFoundError(f"Member `{name}` not found in delta archive.")
+
+    return json.loads(member.read())
+
+
+def _validate_manifest(manifest):
+    """
+    Validates the categories and ids in the manifest, as they are used to construct file paths.
+    """
+
+    for section in ("encyclopedia", "reports"):
+        for category in manifest[section]:
+            if not re.fullmatch(r"[a-z]+", category):
+                raise ValueError(f"Invalid category `{category}` in delta manifest.")
+
+    for category, entries in manifest["encyclopedia"].items():
+        if "base" not in entries:
+            raise ValueError(
+                f"Missing entry base hashes for category `{category}` in delta manifest."
+            )
+
+        for entry_id in [*entries["upserted"], *entries["removed"], *entries["base"]]:
+            if not re.fullmatch(r"\d+", entry_id):
+                raise ValueError(
+                    f"Invalid entry id `{entry_id}` for category `{category}` in delta manifest."
+                )
+
+
+@click.group(
+    name="delta",
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
+def delta():
+    """
+    Build and apply delta archives between two revisions.
+    """
+
+
+@delta.command(
+    name="build",
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
+@click.option(
+    "--input-directory",
+    "-i",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, resolve_path=True),
+    required=False,
+    multiple=False,
+    show_default=True,
+    default=".",
+    help="Path to the git repository.",
+)
+@click.option(
+    "--from",
+    "from_revision",
+    type=str,
+    required=True,
+    multiple=False,
+    help="Revision (e.g. previous release tag) to build the delta from.",
+)
+@click.option(
+    "--to",
+    "to_revision",
+    type=str,
+    required=False,
+    multiple=False,
+    show_default=True,
+    default="HEAD",
+    help="Revision to build the delta to.",
+)
+@click.option(
+    "--output-file",
+    "-o",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True),
+    required=True,
+    multiple=False,
+    help="Path to save the delta archive (.tar.gz) to.",
+)
+@logger.catch(reraise=True)
+def build(input_directory, from_revision, to_revision, output_file):
+    """
+    Build a delta archive with the changed encyclopedia entries and report deltas between two revisions.
+    """
+
+    input_directory = Path(click.format_filename(input_directory))
+    from_commit = _resolve_revision(input_directory, from_revision)
+    to_commit = _resolve_revision(input_directory, to_revision)
+
+    manifest: dict = {
+        "from": from_commit,
+        "to": to_commit,
+        "encyclopedia": {},
+        "reports": {},
+    }
+    upserted_paths = []
+    base_paths = []
+    report_paths = []
+    for status, path in _get_changed_files(input_directory, from_commit, to_commit):
+        encyclopedia_match = ENCYCLOPEDIA_PATH_PATTERN.match(path)
+        if encyclopedia_match:
+            entries = manifest["encyclopedia"].setdefault(
+                encyclopedia_match.group("category"),
+                {"upserted": {}, "removed": [], "base": {}},
+            )
+
+            # Added entries have no base, so they must not exist in the local copy yet
+            if status == "A":
+                entries["base"][encyclopedia_match.group("id")] = None
+            else:
+                base_paths.append(path)
+
+            if status == "D":
+                entries["removed"].append(encyclopedia_match.group("id"))
+            else:
+                upserted_paths.append(path)
+            continue
+
+        if REPORT_PATH_PATTERN.match(path):
+            report_paths.append((status, path))
+
+    base_contents = _read_git_files(input_directory, from_commit, base_paths)
+    for path, contents in base_contents.items():
+        encyclopedia_match = ENCYCLOPEDIA_PATH_PATTERN.match(path)
+        assert encyclopedia_match is not None
+
+        manifest["encyclopedia"][encyclopedia_match.group("category")]["base"][
+            encyclopedia_match.group("id")
+        ] = _get_hash(json.loads(contents))
+
+    upserted_contents = _read_git_files(input_directory, to_commit, upserted_paths)
+    with tarfile.open(output_file, "w:gz") as archive:
+        for path, contents in upserted_contents.items():
+            encyclopedia_match = ENCYCLOPEDIA_PATH_PATTERN.match(path)
+            assert encyclopedia_match is not None
+
+            encyclopedia_entry = json.loads(contents)
+            manifest["encyclopedia"][encyclopedia_match.group("category")]["upserted"][
+                encyclopedia_match.group("id")
+            ] = _get_hash(encyclopedia_entry)
+            _add_tar_member(archive, path, _compact_json(encyclopedia_entry))
+
+        for status, path in report_paths:
+            category = REPORT_PATH_PATTERN.match(path).group("category")  # type: ignore[union-attr]
+            old_report = (
+                []
+                if status == "A"
+                else json.loads(
+                    _read_git_files(input_directory, from_commit, [path])[path]
+                )
+            )
+            new_report = (
+                None
+                if status == "D"
+                else json.loads(
+                    _read_git_files(input_directory, to_commit, [path])[path]
+                )
+            )
+
+            manifest["reports"][category] = {
+                "base": None if status == "A" else _get_hash(old_report),
+                "hash": None if new_report is None else _get_hash(new_report),
+            }
+            if new_report is not None:
+                _add_tar_member(
+                    archive,
+                    path,
+                    _compact_json(_get_report_delta(old_report, new_report)),
+                )
+
+        _add_tar_member(archive, "manifest.json", _compact_json(manifest))
+
+    upserted_count = sum(
+        len(entries["upserted"]) for entries in manifest["encyclopedia"].values()
+    )
+    removed_count = sum(
+        len(entries["removed"]) for entries in manifest["encyclopedia"].values()
+    )
+    logger.success(
+        f"Delta from `{from_commit}` to `{to_commit}` with {upserted_count} changed, {removed_count} removed entries and {len(manifest['reports'])} report(s) saved to `{output_file}`."
+    )
+
+
+@delta.command(
+    name="apply",
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
+@click.argument(
+    "delta_file",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+)
+@click.option(
+    "--output-directory",
+    "-o",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, resolve_path=True),
+    required=False,
+    multiple=False,
+    show_default=True,
+    default=".",
+    help="Path to the local copy containing the `encyclopedia` and `reports` directories.",
+)
+@logger.catch(reraise=True)
+def apply(delta_file, output_directory):
+    """
+    Apply a delta archive to a local copy and verify the result against its manifest.
+    """
+
+    output_directory = Path(click.format_filename(output_directory))
+
+    with tarfile.open(delta_file, "r:gz") as archive:
+        manifest = _read_tar_member(archive, "manifest.json")
+        _validate_manifest(manifest)
+
+        # Check all reports before writing anything, as report deltas require the matching base report
+        reports = {}
+        for category, report_hashes in manifest["reports"].items():
+            report_path = output_directory / "reports" / category / "report.json"
+            report = (
+                json.loads(report_path.read_text(encoding="utf8"))
+                if report_path.is_file()
+                else None
+            )
+            report_hash = None if report is None else _get_hash(report)
+            if report_hash == report_hashes["hash"]:
+                logger.info(f"Report `{report_path}` is already up to date.")
+                continue
+
+            if report_hash != report_hashes["base"]:
+                logger.critical(
+                    f"Report `{report_path}` does not match the base of the delta from `{manifest['from']}`."
+                )
+                exit(1)
+
+            reports[category] = report or []
+
+        # Check all changed entries as well, so a local copy that skipped a delta or drifted is not patched
+        mismatched_entries = []
+        for category, entries in manifest["encyclopedia"].items():
+            category_path = output_directory / "encyclopedia" / category
+            for entry_id, base_hash in entries["base"].items():
+                entry_path = category_path / f"{entry_id}.json"
+                entry_hash = (
+                    _get_hash(json.loads(entry_path.read_bytes()))
+                    if entry_path.is_file()
+                    else None
+                )
+                if entry_hash in (base_hash, entries["upserted"].get(entry_id)):
+                    continue
+
+                mismatched_entries.append(entry_path)
+
+        if mismatched_entries:
+            for mismatched_entry in mismatched_entries:
+                logger.critical(
+                    f"Entry `{mismatched_entry}` does not match the base of the delta from `{manifest['from']}`."
+                )
+            exit(1)
+
+        for category, entries in manifest["encyclopedia"].items():
+            category_path = output_directory / "encyclopedia" / category
+            category_path.mkdir(parents=True, exist_ok=True)
+            for entry_id in entries["upserted"]:
+                write_json_file(
+                    category_path / f"{entry_id}.json",
+                    _read_tar_member(
+                        archive, f"encyclopedia/{category}/{entry_id}.json"
+                    ),
+                )
+
+            for entry_id in entries["removed"]:
+                (category_path / f"{entry_id}.json").unlink(missing_ok=True)
+
+        for category, report in reports.items():
+            report_path = output_directory / "reports" / category / "report.json"
+            if manifest["reports"][category]["hash"] is None:
+                report_path.unlink(missing_ok=True)
+                continue
+
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_file(
+                report_path,
+                _apply_report_delta(
+                    report,
+                    _read_tar_member(archive, f"reports/{category}/report.json"),
+                ),
+            )
+
+    mismatched_files = []
+    for category, entries in manifest["encyclopedia"].items():
+        category_path = output_directory / "encyclopedia" / category
+        for entry_id, entry_hash in entries["upserted"].items():
+            entry_path = category_path / f"{entry_id}.json"
+            if _get_hash(json.loads(entry_path.read_bytes())) != entry_hash:
+                mismatched_files.append(entry_path)
+
+        for entry_id in entries["removed"]:
+            if (category_path / f"{entry_id}.json").exists():
+                mismatched_files.append(category_path / f"{entry_id}.json")
+
+    for category, report_hashes in manifest["reports"].items():
+        report_path = output_directory / "reports" / category / "report.json"
+        if report_hashes["hash"] is not None and (
+            _get_hash(json.loads(report_path.read_bytes())) != report_hashes["hash"]
+        ):
+            mismatched_files.append(report_path)
+
+    if mismatched_files:
+        for mismatched_file in mismatched_files:
+            logger.critical(f"Verification failed for `{mismatched_file}`.")
+        exit(1)
+
+    logger.success(
+        f"Delta from `{manifest['from']}` to `{manifest['to']}` applied to `{output_directory}`."
+    )
@@ -0,0 +1,64 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+
+def serialize_json(data) -> str:
+    return json.dumps(data, sort_keys=False, indent=4, ensure_ascii=False)
+
+
+def get_id_sort_key(value: str) -> tuple[int, str]:
+    """
+    Sorts numeric ids numerically, before any non-numeric ids.
+    """
+
+    return int(value) if value.isdigit() else -1, value
+
+
+def write_temp_json_file(file_path: Path, data) -> Path:
+    """
+    Writes the JSON to a hidden temporary file next to the target and returns its path, so it can be committed
+    with `os.replace` later on.
+    """
+
+    temp_file_path = file_path.with_name(
+        f".{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(temp_file_path, "w", encoding="utf8") as output_file:
+            output_file.write(serialize_json(data))
+    except BaseException:
+        temp_file_path.unlink(missing_ok=True)
+        raise
+
+    return temp_file_path
+
+
+def write_json_file(file_path: Path, data, fsync: bool = False):
+    """
+    Writes the JSON to a temporary file next to the target and atomically moves it in place, so an interrupted
+    write never leaves a truncated file behind.
+    """
+
+    temp_file_path = write_temp_json_file(file_path, data)
+    try:
+        if fsync:
+            fsync_path(temp_file_path)
+
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        temp_file_path.unlink(missing_ok=True)
+        raise
+
+
+def fsync_path(path: Path):
+    """
+    Flushes the file or directory to disk.
+    """
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
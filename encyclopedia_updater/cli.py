@@ -1,17 +1,49 @@
+import hashlib
 import json
 import os
 import re
 import subprocess as sp
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timezone
+from functools import partial
 
 import click
-import requests
 from loguru import logger
 
+from ann_encyclopedia.cache import ResponseCache, get_response_cache
+from ann_encyclopedia.files import (
+    fsync_path,
+    get_id_sort_key,
+    serialize_json,
+    write_json_file,
+    write_temp_json_file,
+)
+
 BASE_DIR = Path(__file__).parent.parent
 
+# Keys that change on every update run and are ignored when comparing entry contents
+VOLATILE_ENTRY_KEYS = (
+    "+@generated-on",
+    "+@date-last-modified-at",
+    "+@date-last-updated-at",
+)
+
+# Amount of bytes read from the end of an entry file to find the last updated date
+LAST_UPDATED_AT_TAIL_SIZE = 256
+LAST_UPDATED_AT_PATTERN = re.compile(
+    r'"\+@date-last-updated-at":\s*"(?P<date>[^"]*)"\s*}\s*$'
+)
+
+# Date keys that are expected to be ISO 8601 strings, mapped to whether `null` is allowed
+ENTRY_DATE_KEYS = {
+    "+@generated-on": False,
+    "+@date-added": True,
+    "+@date-last-modified-at": False,
+    "+@date-last-updated-at": False,
+}
+
 
 def _skip_broken_entries_for_category(category: str):
     """
@@ -142,6 +174,40 @@ def _read_encyclopedia_entry_file(file_path: Path):
     return data
 
 
+def _get_related_entries_pattern_for_category(category: str) -> re.Pattern | None:
+    """
+    Returns the compiled pattern matching "related" entry names to skip, if any.
+    """
+
+    keywords = _skip_related_entries_for_category(category)
+    if not keywords:
+        return None
+
+    keyword_pattern = "|".join([f"({keyword})" for keyword in keywords])
+
+    return re.compile(rf".*?\((?P<type>{keyword_pattern}).*?\)\s*$", re.IGNORECASE)
+
+
+def _read_encyclopedia_entry_last_updated_at(file_path: Path) -> str | None:
+    """
+    Returns the `+@date-last-updated-at` value of an encyclopedia entry file, if present.
+
+    The key is always written last by the encyclopedia updater, so only the tail of the file is read. The full file
+    is parsed as fallback when the key is not found there.
+    """
+
+    with open(str(file_path), "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - LAST_UPDATED_AT_TAIL_SIZE, 0))
+        tail = f.read().decode("utf-8", errors="ignore")
+
+    match = LAST_UPDATED_AT_PATTERN.search(tail)
+    if match:
+        return match.group("date")
+
+    return _read_encyclopedia_entry_file(file_path).get("+@date-last-updated-at")
+
+
 def _get_entries_to_update(
     report: list, category, category_path: Path, threshold_days: int = 30
 ):
@@ -154,52 +220,44 @@ def _get_entries_to_update(
         "skipped": [],
         "broken": [],
     }
+
+    broken_entries = set(_skip_broken_entries_for_category(category))
+    related_entries_pattern = _get_related_entries_pattern_for_category(category)
+    existing_files = {
+        entry.name for entry in os.scandir(category_path) if entry.is_file()
+    }
+    current_timestamp = int(_get_current_datetime().timestamp())
     for item in report:
         file_path = category_path / f"{item['id']}.json"
 
         # Skip items that have invalid XML syntax
-        if int(item["id"]) in _skip_broken_entries_for_category(category):
+        if int(item["id"]) in broken_entries:
             logger.info(f"Skipping broken item `{item['name']}` ({item['id']}).")
             result["broken"].append({"file": None, "item": item})
             continue
 
         # Skip items that cannot be retrieved through the API
-        if item["name"] is not None:
-            keywords = _skip_related_entries_for_category(category)
-            if keywords:
-                keyword_pattern = "|".join([f"({keyword})" for keyword in keywords])
-                full_pattern = rf".*?\((?P<type>{keyword_pattern}).*?\)\s*$"
-                match = re.search(
-                    full_pattern,
-                    item["name"],
-                    re.IGNORECASE,
+        if item["name"] is not None and related_entries_pattern is not None:
+            match = related_entries_pattern.search(item["name"])
+            if match:
+                logger.info(
+                    f"Skipping `{match.group('type')}` item `{item['name']}` ({item['id']})."
                 )
+                result["skipped"].append({"file": None, "item": item})
+                continue
 
-                if match:
-                    logger.info(
-                        f"Skipping `{match.group('type')}` item `{item['name']}` ({item['id']})."
-                    )
-                    result["skipped"].append({"file": None, "item": item})
-                    continue
-
-        if not file_path.is_file():
+        if file_path.name not in existing_files:
             logger.info(f"File does not exist: {file_path}")
             result["missing"].append({"file": None, "item": item})
             continue
 
-        encyclopedia_entry = _read_encyclopedia_entry_file(file_path)
-        if "+@date-last-updated-at" in encyclopedia_entry:
-            last_updated_at = _iso_string_to_timestamp(
-                encyclopedia_entry["+@date-last-updated-at"]
-            )
+        last_updated_at_string = _read_encyclopedia_entry_last_updated_at(file_path)
+        if last_updated_at_string is not None:
+            last_updated_at = _iso_string_to_timestamp(last_updated_at_string)
         else:
             # This should only occur when files were added manually and do not include "+@date-last-updated-at" key
-            git_last_modified_timestamp_command = (
-                git_last_modified_timestamp_command + [str(file_path)]
-            )
-
             response = sp.run(
-                git_last_modified_timestamp_command,
+                git_last_modified_timestamp_command + [str(file_path)],
                 text=True,
                 capture_output=True,
             )
@@ -213,11 +271,9 @@ def _get_entries_to_update(
             if response.stdout:
                 last_updated_at = int(response.stdout)
             else:
-                last_updated_at = int(_get_current_datetime().timestamp())
+                last_updated_at = current_timestamp
 
-        timestamp_difference = int(_get_current_datetime().timestamp()) - int(
-            last_updated_at
-        )
+        timestamp_difference = current_timestamp - int(last_updated_at)
         timestamp_difference_in_days = timestamp_difference / (60 * 60 * 24)
         if timestamp_difference_in_days > threshold_days:
             logger.info(f"File exists (outdated): {file_path}")
@@ -234,7 +290,10 @@ def _get_current_datetime():
     return datetime.now()
 
 
-def _get_encyclopedia_entries(url: str, category: str, max_retries: int = 3):
+def _request_encyclopedia_entries(url: str, category: str, max_retries: int = 3):
+    # Imported here as it is only needed by commands that retrieve entries
+    import requests
+
     retries = 0
     while retries < max_retries:
         try:
@@ -257,9 +316,13 @@ def _get_encyclopedia_entries(url: str, category: str, max_retries: int = 3):
             )
             raise
 
+    return encyclopedia_response.text.encode("utf-8")
+
+
+def _convert_encyclopedia_entries(xml_content: bytes, url: str):
     response = sp.run(
         ["yq", "-p=xml", "-o=json"],
-        input=encyclopedia_response.text,
+        input=xml_content.decode("utf-8"),
         text=True,
         capture_output=True,
     )
@@ -274,7 +337,30 @@ def _get_encyclopedia_entries(url: str, category: str, max_retries: int = 3):
     return json_data["ann"]
 
 
-def _apply_additional_date_info(encyclopedia_entry, report_entry):
+def _get_encyclopedia_entries(
+    url: str, category: str, max_retries: int = 3, cache: ResponseCache | None = None
+):
+    if cache is None:
+        xml_content = _request_encyclopedia_entries(url, category, max_retries)
+    else:
+        xml_content = cache.get_or_fetch(
+            url, partial(_request_encyclopedia_entries, url, category, max_retries)
+        )
+
+    return _convert_encyclopedia_entries(xml_content, url)
+
+
+def _apply_additional_date_info(
+    encyclopedia_entry, report_entry, retrieved_at: datetime | None = None
+):
+    """
+    Applies the additional date fields. The update dates are set to `retrieved_at`, the moment the entry was
+    retrieved from the API, which defaults to the current datetime.
+    """
+
+    if retrieved_at is None:
+        retrieved_at = _get_current_datetime()
+
     # "+@date-added" is the date the file was added to the encyclopedia.
     if "+@date-added" not in encyclopedia_entry:
         # This was already reformatted to ISO in report, so no additional formatting needed here.
@@ -286,32 +372,350 @@ def _apply_additional_date_info(encyclopedia_entry, report_entry):
     ):
         logger.info(f"File contents changed for {encyclopedia_entry['+@id']}")
         encyclopedia_entry["+@date-last-modified-at"] = _datetime_object_to_iso(
-            _get_current_datetime()
+            retrieved_at
         )
 
     # "+@date-last-updated-at" denotes when the file was last updated, modified or not.
-    encyclopedia_entry["+@date-last-updated-at"] = _datetime_object_to_iso(
-        _get_current_datetime()
+    encyclopedia_entry["+@date-last-updated-at"] = _datetime_object_to_iso(retrieved_at)
+
+
+def _process_encyclopedia_entry(
+    encyclopedia_entry,
+    report_entry,
+    encyclopedia_category_directory: Path,
+    retrieved_at: datetime | None = None,
+) -> tuple[Path, Path]:
+    """
+    Applies the additional date info and writes the entry to a temporary file. Runs inside the worker pool of
+    `_save_encyclopedia_entries`; the temporary file is moved in place once all entries of the batch are written.
+    """
+
+    # Additional custom date fields
+    _apply_additional_date_info(encyclopedia_entry, report_entry, retrieved_at)
+
+    encyclopedia_path = encyclopedia_category_directory.joinpath(
+        f"{encyclopedia_entry['+@id']}.json"
+    )
+
+    return (
+        write_temp_json_file(encyclopedia_path, encyclopedia_entry),
+        encyclopedia_path,
     )
 
 
-def _save_json(
-    data, encyclopedia_category_directory: Path, category: str, id_value: int
+def _get_encyclopedia_entries_to_save(
+    encyclopedia_entries, category: str, report_entries: dict
 ):
-    encyclopedia_path = encyclopedia_category_directory.joinpath(f"{id_value}.json")
-    with open(encyclopedia_path, "w", encoding="utf8") as output_file:
-        json.dump(data, output_file, sort_keys=False, indent=4, ensure_ascii=False)
+    """
+    Yields the retrieved entries of the category together with their original report item.
+    """
+
+    for key, category_encyclopedia_entries in encyclopedia_entries.items():
+        # If only 1 entry is retrieved it will be a dictionary and needs to be in a list
+        if isinstance(category_encyclopedia_entries, dict):
+            category_encyclopedia_entries = [category_encyclopedia_entries]
+
+        if key == "warning":
+            # If only 1 warning entry is found it will be a string and needs to be in a list
+            if isinstance(category_encyclopedia_entries, str):
+                category_encyclopedia_entries = [category_encyclopedia_entries]
+
+            for warning_not_found_item in category_encyclopedia_entries:
+                logger.warning(f"Skipped. Warning: {warning_not_found_item}")
+            continue
+
+        if key != category:
+            for warning_unexpected_category_item in category_encyclopedia_entries:
+                logger.warning(
+                    f"Skipped. Unexpected entry type `{key}` for entry `{warning_unexpected_category_item}`."
+                )
+            continue
+
+        for encyclopedia_entry in category_encyclopedia_entries:
+            encyclopedia_id = encyclopedia_entry["+@id"]
+
+            # Get original report item
+            matching_report_item = report_entries.get(str(encyclopedia_id))
+            if matching_report_item is None:
+                logger.warning(
+                    f"Skipped. No report item found for entry `{encyclopedia_id}`."
+                )
+                continue
+
+            yield encyclopedia_entry, matching_report_item
+
+
+def _save_encyclopedia_entries(
+    encyclopedia_entries,
+    category: str,
+    report_entries: dict,
+    encyclopedia_category_directory: Path,
+    write_workers: int,
+    fsync: bool = False,
+    retrieved_at: datetime | None = None,
+):
+    """
+    Saves the retrieved entries in two stages: the entries are diffed and written to temporary files in parallel,
+    after which the whole batch is committed with `os.replace`.
+
+    The entries are already retrieved and parsed in a single request, so there is no queue providing back-pressure;
+    the amount of pending writes is only bounded by `--batch-size` (at most 50 entries).
+    """
+
+    # Parallel diff/write stage
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=write_workers) as executor:
+            entries_to_save = _get_encyclopedia_entries_to_save(
+                encyclopedia_entries, category, report_entries
+            )
+            for encyclopedia_entry, matching_report_item in entries_to_save:
+                futures.append(
+                    executor.submit(
+                        _process_encyclopedia_entry,
+                        encyclopedia_entry,
+                        matching_report_item,
+                        encyclopedia_category_directory,
+                        retrieved_at,
+                    )
+                )
+
+        # Batch commit stage; raises the first error, if any
+        temp_files = [future.result() for future in futures]
+
+        if fsync:
+            # Flush all temporary files together before any of them is committed
+            with ThreadPoolExecutor(max_workers=write_workers) as executor:
+                list(
+                    executor.map(
+                        fsync_path, [temp_file_path for temp_file_path, _ in temp_files]
+                    )
+                )
+
+        for temp_file_path, encyclopedia_path in temp_files:
+            os.replace(temp_file_path, encyclopedia_path)
+            logger.success(
+                f"Encyclopedia entry `{encyclopedia_path.stem}` for category `{category}` saved to `{str(encyclopedia_path)}`."
+            )
+    except BaseException:
+        # Remove the temporary files of entries that were not committed
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                future.result()[0].unlink(missing_ok=True)
+        raise
+
+    if fsync:
+        fsync_path(encyclopedia_category_directory)
+
+
+def _get_encyclopedia_entry_content_hash(encyclopedia_entry) -> str:
+    """
+    Returns the SHA-256 hash of the entry contents, ignoring the volatile date keys.
+    """
 
-    logger.success(
-        f"Encyclopedia entry `{id_value}` for category `{category}` saved to `{str(encyclopedia_path)}`."
+    contents = {
+        key: value
+        for key, value in encyclopedia_entry.items()
+        if key not in VOLATILE_ENTRY_KEYS
+    }
+    serialized_contents = json.dumps(
+        contents, sort_keys=True, separators=(",", ":"), ensure_ascii=False
     )
 
+    return hashlib.sha256(serialized_contents.encode("utf-8")).hexdigest()
 
-@logger.catch(reraise=True)
-@click.command(
+
+def _is_valid_iso_string(value) -> bool:
+    if not isinstance(value, str):
+        return False
+
+    try:
+        _iso_string_to_timestamp(value)
+    except ValueError:
+        return False
+
+    return True
+
+
+def _get_encyclopedia_files(category_path: Path) -> list[Path]:
+    return sorted(category_path.glob("*.json"))
+
+
+def _chunk_list(items: list, chunk_size: int) -> list[list]:
+    return [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def _run_in_process_pool(function, chunks: list[list], workers: int | None):
+    """
+    Runs the function for each chunk in a process pool and yields the results as soon as they are completed.
+    """
+
+    # Imported here as it pulls in multiprocessing, which is only needed by the maintenance commands
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(function, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _verify_encyclopedia_files(
+    file_paths: list[Path], repair: bool = False, delete_corrupt: bool = False
+):
+    """
+    Verifies a chunk of encyclopedia entry files and optionally repairs them in place.
+
+    When repairing, invalid date keys are removed and entries are re-serialized when their contents differ from the
+    format written by the encyclopedia updater. Corrupt files are only deleted (so they will be retrieved again as
+    `missing`) when explicitly requested. Files with an `+@id` not matching the filename are only reported.
+    """
+
+    results = []
+    for file_path in file_paths:
+        problems: list[dict] = []
+        results.append({"file": str(file_path), "problems": problems})
+
+        try:
+            with open(file_path, "r", encoding="utf8") as f:
+                raw_contents = f.read()
+            encyclopedia_entry = json.loads(raw_contents)
+            if not isinstance(encyclopedia_entry, dict):
+                raise ValueError(
+                    f"Expected JSON object, got `{type(encyclopedia_entry).__name__}`"
+                )
+        except ValueError as err:
+            if delete_corrupt:
+                os.remove(file_path)
+            problems.append(
+                {"type": "corrupt", "detail": str(err), "repaired": delete_corrupt}
+            )
+            continue
+
+        if str(encyclopedia_entry.get("+@id")) != file_path.stem:
+            problems.append(
+                {
+                    "type": "mismatched",
+                    "detail": f"Entry has `+@id` `{encyclopedia_entry.get('+@id')}`",
+                    "repaired": False,
+                }
+            )
+
+        for date_key, is_nullable in ENTRY_DATE_KEYS.items():
+            if date_key not in encyclopedia_entry:
+                continue
+
+            date_value = encyclopedia_entry[date_key]
+            if (date_value is None and is_nullable) or _is_valid_iso_string(date_value):
+                continue
+
+            if repair:
+                del encyclopedia_entry[date_key]
+            problems.append(
+                {
+                    "type": "invalid-date",
+                    "detail": f"Invalid `{date_key}` value `{date_value}`",
+                    "repaired": repair,
+                }
+            )
+
+        serialized_contents = serialize_json(encyclopedia_entry)
+        if serialized_contents != raw_contents:
+            if not any(problem["type"] == "invalid-date" for problem in problems):
+                problems.append(
+                    {
+                        "type": "non-canonical",
+                        "detail": "File contents differ from serialized entry",
+                        "repaired": repair,
+                    }
+                )
+
+            if repair:
+                write_json_file(file_path, encyclopedia_entry)
+
+    return results
+
+
+def _hash_encyclopedia_files(file_paths: list[Path]):
+    """
+    Computes the content hashes for a chunk of encyclopedia entry files.
+    """
+
+    results = []
+    for file_path in file_paths:
+        try:
+            encyclopedia_entry = _read_encyclopedia_entry_file(file_path)
+        except ValueError as err:
+            results.append({"file": str(file_path), "hash": None, "error": str(err)})
+            continue
+
+        results.append(
+            {
+                "file": str(file_path),
+                "hash": _get_encyclopedia_entry_content_hash(encyclopedia_entry),
+                "error": None,
+            }
+        )
+
+    return results
+
+
+def _get_report_ids_for_category(category: str) -> set[str] | None:
+    try:
+        report = _read_report_for_category_file(category)
+    except FileNotFoundError as err:
+        logger.warning(f"{err} Skipping check for orphaned entries.")
+        return None
+
+    return {str(item["id"]) for item in report}
+
+
+def _write_json_output(data, output_file: str | None):
+    contents = json.dumps(data, sort_keys=False, indent=4, ensure_ascii=False)
+    if output_file is None:
+        click.echo(contents)
+        return
+
+    with open(output_file, "w", encoding="utf8") as f:
+        f.write(contents)
+
+    logger.info(f"Output saved to `{output_file}`.")
+
+
+class DefaultCommandGroup(click.Group):
+    """
+    Group that invokes the default command when no subcommand is given, so existing invocations without a subcommand
+    (e.g. `encyclopedia_updater -c anime -t missing`) keep working.
+    """
+
+    def __init__(self, *args, default_command: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if not args or (
+            args[0] not in self.commands and args[0] not in ctx.help_option_names
+        ):
+            args = [self.default_command, *args]
+
+        return super().parse_args(ctx, args)
+
+
+@click.group(
+    cls=DefaultCommandGroup,
+    default_command="update",
     context_settings={"help_option_names": ["-h", "--help"]},
     epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
 )
+def cli():
+    """
+    Retrieve and maintain Anime News Network encyclopedia entries.
+    """
+
+
+@cli.command(
+    name="update",
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
 @click.option(
     "--input-directory",
     "-i",
@@ -370,7 +774,75 @@ def _save_json(
     show_default=True,
     help="Amount of days when to consider encyclopedia entry outdated since last modified.",
 )
-def cli(input_directory, output_directory, category, entry_type, batch_size, days):
+@click.option(
+    "--write-workers",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=4,
+    show_default=True,
+    help="Amount of worker threads used to diff and save entries.",
+)
+@click.option(
+    "--fsync/--no-fsync",
+    required=False,
+    default=False,
+    show_default=True,
+    help="Flush all written entries to disk once per batch, before they are moved in place.",
+)
+@click.option(
+    "--cache-directory",
+    type=click.Path(exists=False, file_okay=False, dir_okay=True, resolve_path=True),
+    required=False,
+    multiple=False,
+    envvar="ANN_CACHE_DIRECTORY",
+    help="Path to the response cache directory. Responses are not cached if omitted.",
+)
+@click.option(
+    "--cache-ttl",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=86400,
+    show_default=True,
+    help="Amount of seconds a cached response is used before it is retrieved again.",
+)
+@click.option(
+    "--cache-max-size",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=512,
+    show_default=True,
+    help="Maximum size of the response cache in MB.",
+)
+@click.option(
+    "--replay",
+    "--offline",
+    "replay",
+    is_flag=True,
+    default=False,
+    help="Reconvert and save all cached entries for the category, without network access.",
+)
+@logger.catch(reraise=True, exclude=click.ClickException)
+def update(
+    input_directory,
+    output_directory,
+    category,
+    entry_type,
+    batch_size,
+    days,
+    write_workers,
+    fsync,
+    cache_directory,
+    cache_ttl,
+    cache_max_size,
+    replay,
+):
+    """
+    Retrieve missing or outdated encyclopedia entries.
+    """
+
     input_directory = Path(click.format_filename(input_directory))
     output_directory = Path(click.format_filename(output_directory))
 
@@ -381,11 +853,47 @@ def cli(input_directory, output_directory, category, entry_type, batch_size, day
         output_directory, category
     )
 
+    cache = get_response_cache(cache_directory, cache_ttl, cache_max_size, replay)
+
     report = _read_report_for_category_file(category)
     entries = _get_entries_to_update(
         report, category, encyclopedia_category_input_directory, days
     )
 
+    if cache is not None and cache.offline:
+        report_entries = {
+            str(entry["item"]["id"]): entry
+            for bucket in ("exist", "missing", "outdated")
+            for entry in entries[bucket]
+        }
+
+        # Replay all cached responses (oldest first), so the most recent response of an entry is saved last
+        replayed_responses = 0
+        for url, fetched_at, xml_content in cache.items("/encyclopedia/api.xml"):
+            replayed_responses += 1
+            encyclopedia_entries = _convert_encyclopedia_entries(xml_content, url)
+            if category not in encyclopedia_entries:
+                logger.info(
+                    f"Skipped. Cached response for URL `{url}` has no entries of category `{category}`."
+                )
+                continue
+
+            # Date the entries by when the response was retrieved, as replayed responses can be older than the TTL
+            _save_encyclopedia_entries(
+                encyclopedia_entries,
+                category,
+                report_entries,
+                encyclopedia_category_output_directory,
+                write_workers,
+                fsync,
+                datetime.fromtimestamp(fetched_at, tz=timezone.utc),
+            )
+
+        if not replayed_responses:
+            logger.success("No cached responses to replay.")
+
+        return
+
     to_be_updated_entries = entries[entry_type][:batch_size]
     to_be_updated_entry_ids = [
         str(entry["item"]["id"]) for entry in to_be_updated_entries
@@ -397,48 +905,361 @@ def cli(input_directory, output_directory, category, entry_type, batch_size, day
     entry_ids_as_query_param = "/".join(to_be_updated_entry_ids)
 
     encyclopedia_entry_url = f"https://www.animenewsnetwork.com/encyclopedia/api.xml?title={entry_ids_as_query_param}"
-    encyclopedia_entries = _get_encyclopedia_entries(encyclopedia_entry_url, category)
+    encyclopedia_entries = _get_encyclopedia_entries(
+        encyclopedia_entry_url, category, cache=cache
+    )
 
-    for key, category_encyclopedia_entries in encyclopedia_entries.items():
-        # If only 1 entry is retrieved it will be a dictionary and needs to be in a list
-        if isinstance(category_encyclopedia_entries, dict):
-            category_encyclopedia_entries = [category_encyclopedia_entries]
+    _save_encyclopedia_entries(
+        encyclopedia_entries,
+        category,
+        {str(entry["item"]["id"]): entry for entry in to_be_updated_entries},
+        encyclopedia_category_output_directory,
+        write_workers,
+        fsync,
+    )
 
-        if key == "warning":
-            # If only 1 warning entry is found it will be a string and needs to be in a list
-            if isinstance(category_encyclopedia_entries, str):
-                category_encyclopedia_entries = [category_encyclopedia_entries]
 
-            for warning_not_found_item in category_encyclopedia_entries:
-                logger.warning(f"Skipped. Warning: {warning_not_found_item}")
-            continue
+@cli.command(
+    name="plan",
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
+@click.option(
+    "--input-directory",
+    "-i",
+    type=click.Path(exists=False, dir_okay=True, resolve_path=True),
+    required=False,
+    multiple=False,
+    show_default=True,
+    default="./encyclopedia",
+    help="Path to input encyclopedia directory",
+)
+@click.option(
+    "--category",
+    "-c",
+    type=click.Choice(["anime", "manga"], case_sensitive=False),
+    required=True,
+    multiple=False,
+    help="Plan encyclopedia entry updates for specified category.",
+)
+@click.option(
+    "--entry-type",
+    "-t",
+    type=click.Choice(["missing", "outdated"], case_sensitive=False),
+    required=False,
+    multiple=False,
+    default="missing",
+    show_default=True,
+    help="Plan 'missing' or 'outdated' encyclopedia entries.",
+)
+@click.option(
+    "--batch-size",
+    "-b",
+    type=click.IntRange(1, 50),
+    required=True,
+    multiple=False,
+    default=50,
+    show_default=True,
+    help="Batch amount of entries to update.",
+)
+@click.option(
+    "--days",
+    "-d",
+    type=int,
+    required=True,
+    multiple=False,
+    default=30,
+    show_default=True,
+    help="Amount of days when to consider encyclopedia entry outdated since last modified.",
+)
+@click.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    default=False,
+    help="Output the plan as JSON.",
+)
+@logger.catch(reraise=True)
+def plan(input_directory, category, entry_type, batch_size, days, as_json):
+    """
+    Show the amount of entries per type and the batches to update, without retrieving anything.
+    """
 
-        if key != category:
-            for warning_unexpected_category_item in category_encyclopedia_entries:
-                logger.warning(
-                    f"Skipped. Unexpected entry type `{key}` for entry `{warning_unexpected_category_item}`."
+    input_directory = Path(click.format_filename(input_directory))
+    category = category.lower()
+    entry_type = entry_type.lower()
+
+    encyclopedia_category_input_directory = _get_encyclopedia_directory(
+        input_directory, category
+    )
+
+    report = _read_report_for_category_file(category)
+    entries = _get_entries_to_update(
+        report, category, encyclopedia_category_input_directory, days
+    )
+
+    counts = {key: len(value) for key, value in entries.items()}
+    batches = _chunk_list(
+        [str(entry["item"]["id"]) for entry in entries[entry_type]], batch_size
+    )
+
+    if as_json:
+        _write_json_output(
+            {
+                "category": category,
+                "entry_type": entry_type,
+                "batch_size": batch_size,
+                "counts": counts,
+                "batches": batches,
+            },
+            None,
+        )
+        return
+
+    for key, count in counts.items():
+        click.echo(f"{key}: {count}")
+    click.echo(
+        f"{len(batches)} batches of at most {batch_size} `{entry_type}` entries to update."
+    )
+
+
+@cli.command(
+    name="verify",
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
+@click.option(
+    "--input-directory",
+    "-i",
+    type=click.Path(exists=False, dir_okay=True, resolve_path=True),
+    required=False,
+    multiple=False,
+    show_default=True,
+    default="./encyclopedia",
+    help="Path to input encyclopedia directory",
+)
+@click.option(
+    "--category",
+    "-c",
+    type=click.Choice(["anime", "manga"], case_sensitive=False),
+    required=True,
+    multiple=False,
+    help="Verify encyclopedia entries for specified category.",
+)
+@click.option(
+    "--repair/--no-repair",
+    required=False,
+    default=False,
+    show_default=True,
+    help="Repair non-canonical and invalid date entries in place.",
+)
+@click.option(
+    "--delete-corrupt",
+    is_flag=True,
+    default=False,
+    help="Delete corrupt entries, so they will be retrieved again as 'missing'.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=None,
+    help="Amount of worker processes. Defaults to the amount of CPUs.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=500,
+    show_default=True,
+    help="Amount of entries per worker chunk.",
+)
+@click.option(
+    "--output-file",
+    "-o",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True),
+    required=False,
+    multiple=False,
+    help="Path to save the JSON report to. Defaults to stdout.",
+)
+@logger.catch(reraise=True)
+def verify(
+    input_directory, category, repair, delete_corrupt, workers, chunk_size, output_file
+):
+    """
+    Verify (and optionally repair) all encyclopedia entries for a category.
+    """
+
+    input_directory = Path(click.format_filename(input_directory))
+    category = category.lower()
+
+    encyclopedia_category_input_directory = _get_encyclopedia_directory(
+        input_directory, category
+    )
+    file_paths = _get_encyclopedia_files(encyclopedia_category_input_directory)
+    report_ids = _get_report_ids_for_category(category)
+
+    problems: dict[str, list] = {
+        "corrupt": [],
+        "mismatched": [],
+        "invalid-date": [],
+        "non-canonical": [],
+        "orphaned": [],
+    }
+    verified_files = 0
+    for results in _run_in_process_pool(
+        partial(
+            _verify_encyclopedia_files, repair=repair, delete_corrupt=delete_corrupt
+        ),
+        _chunk_list(file_paths, chunk_size),
+        workers,
+    ):
+        for result in results:
+            for problem in result["problems"]:
+                problems[problem["type"]].append(
+                    {
+                        "file": result["file"],
+                        "detail": problem["detail"],
+                        "repaired": problem["repaired"],
+                    }
                 )
-            continue
 
-        for encyclopedia_entry in category_encyclopedia_entries:
-            encyclopedia_id = encyclopedia_entry["+@id"]
+            if report_ids is not None and Path(result["file"]).stem not in report_ids:
+                problems["orphaned"].append(
+                    {
+                        "file": result["file"],
+                        "detail": f"Entry not found in report for category `{category}`",
+                        "repaired": False,
+                    }
+                )
 
-            # Get original report item
-            matching_report_item = next(
-                (
-                    entry
-                    for entry in to_be_updated_entries
-                    if int(entry["item"]["id"]) == int(encyclopedia_id)
-                ),
-                None,
-            )
+        verified_files += len(results)
+        logger.info(f"Verified {verified_files}/{len(file_paths)} entries.")
 
-            # Additional custom date fields
-            _apply_additional_date_info(encyclopedia_entry, matching_report_item)
+    _write_json_output(
+        {
+            "category": category,
+            "total": len(file_paths),
+            "problems": problems,
+        },
+        output_file,
+    )
 
-            _save_json(
-                encyclopedia_entry,
-                encyclopedia_category_output_directory,
-                category,
-                encyclopedia_id,
+    unrepaired_problems = 0
+    for problem_type, problem_items in problems.items():
+        if not problem_items:
+            continue
+
+        # Orphaned entries can not be repaired, so they are only reported and do not fail the verification
+        if problem_type == "orphaned":
+            logger.warning(
+                f"Found {len(problem_items)} `{problem_type}` entries for category `{category}` that are not in the report."
             )
+            continue
+
+        unrepaired_problem_items = [
+            item for item in problem_items if not item["repaired"]
+        ]
+        unrepaired_problems += len(unrepaired_problem_items)
+        logger.warning(
+            f"Found {len(problem_items)} `{problem_type}` entries for category `{category}` ({len(problem_items) - len(unrepaired_problem_items)} repaired)."
+        )
+
+    if unrepaired_problems:
+        exit(1)
+
+    logger.success(f"Verified {len(file_paths)} entries for category `{category}`.")
+
+
+@cli.command(
+    name="rehash",
+    epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
+)
+@click.option(
+    "--input-directory",
+    "-i",
+    type=click.Path(exists=False, dir_okay=True, resolve_path=True),
+    required=False,
+    multiple=False,
+    show_default=True,
+    default="./encyclopedia",
+    help="Path to input encyclopedia directory",
+)
+@click.option(
+    "--category",
+    "-c",
+    type=click.Choice(["anime", "manga"], case_sensitive=False),
+    required=True,
+    multiple=False,
+    help="Compute content hashes for specified category.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=None,
+    help="Amount of worker processes. Defaults to the amount of CPUs.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=500,
+    show_default=True,
+    help="Amount of entries per worker chunk.",
+)
+@click.option(
+    "--output-file",
+    "-o",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True),
+    required=False,
+    multiple=False,
+    help="Path to save the JSON hash manifest to. Defaults to stdout.",
+)
+@logger.catch(reraise=True)
+def rehash(input_directory, category, workers, chunk_size, output_file):
+    """
+    Compute content hashes (ignoring volatile date keys) for all encyclopedia entries of a category.
+    """
+
+    input_directory = Path(click.format_filename(input_directory))
+    category = category.lower()
+
+    encyclopedia_category_input_directory = _get_encyclopedia_directory(
+        input_directory, category
+    )
+    file_paths = _get_encyclopedia_files(encyclopedia_category_input_directory)
+
+    hashes = {}
+    failed_files = 0
+    for results in _run_in_process_pool(
+        _hash_encyclopedia_files, _chunk_list(file_paths, chunk_size), workers
+    ):
+        for result in results:
+            if result["error"] is not None:
+                failed_files += 1
+                logger.warning(
+                    f"Skipped corrupt entry `{result['file']}`: {result['error']}"
+                )
+                continue
+
+            hashes[Path(result["file"]).stem] = result["hash"]
+
+    _write_json_output(
+        {
+            "category": category,
+            "entries": dict(
+                sorted(hashes.items(), key=lambda item: get_id_sort_key(item[0]))
+            ),
+        },
+        output_file,
+    )
+
+    if failed_files:
+        exit(1)
+
+    logger.success(f"Hashed {len(hashes)} entries for category `{category}`.")
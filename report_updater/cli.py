@@ -1,13 +1,15 @@
-import json
 import time
+from functools import partial
 import xml.etree.ElementTree as elementTree
 from pathlib import Path
 from datetime import datetime
 
 import click
-import requests
 from loguru import logger
 
+from ann_encyclopedia.cache import ResponseCache, get_response_cache
+from ann_encyclopedia.files import write_json_file
+
 
 def _get_report_directory(report_directory: Path, category: str) -> Path:
     p = report_directory.joinpath(category)
@@ -28,13 +30,15 @@ def _datetime_to_iso(input_datetime: str) -> str | None:
 
 def _save_json(data, report_category_directory: Path, category: str):
     report_path = report_category_directory.joinpath("report.json")
-    with open(report_path, "w", encoding="utf8") as output_file:
-        json.dump(data, output_file, sort_keys=False, indent=4, ensure_ascii=False)
+    write_json_file(report_path, data)
 
     logger.info(f"Report for category `{category}` saved to `{str(report_path)}`.")
 
 
-def _get_common_data(url: str, category: str):
+def _request_common_data(url: str, category: str) -> bytes:
+    # Imported here as it is only needed by commands that retrieve reports
+    import requests
+
     try:
         report_response = requests.get(url, timeout=60)
         report_response.raise_for_status()
@@ -45,7 +49,18 @@ def _get_common_data(url: str, category: str):
 
         raise
 
-    root_element = elementTree.fromstring(report_response.content)
+    return report_response.content
+
+
+def _get_common_data(url: str, category: str, cache: ResponseCache | None = None):
+    if cache is None:
+        report_content = _request_common_data(url, category)
+    else:
+        report_content = cache.get_or_fetch(
+            url, partial(_request_common_data, url, category)
+        )
+
+    root_element = elementTree.fromstring(report_content)
 
     return [
         {
@@ -65,7 +80,10 @@ def _get_common_data(url: str, category: str):
     ]
 
 
-def _get_search_data(url: str):
+def _request_search_data(url: str) -> bytes:
+    # Imported here as it is only needed by commands that retrieve reports
+    import requests
+
     try:
         report_response = requests.get(url)
         report_response.raise_for_status()
@@ -76,7 +94,16 @@ def _get_search_data(url: str):
 
         raise
 
-    root_element = elementTree.fromstring(report_response.content)
+    return report_response.content
+
+
+def _get_search_data(url: str, cache: ResponseCache | None = None):
+    if cache is None:
+        report_content = _request_search_data(url)
+    else:
+        report_content = cache.get_or_fetch(url, partial(_request_search_data, url))
+
+    root_element = elementTree.fromstring(report_content)
     return [
         {
             "id": _get_text(item, "id") if _get_text(item, "id") else None,
@@ -111,7 +138,7 @@ def _combine_search_data(common_data, search_data):
     ]
 
 
-def get_anime_report():
+def get_anime_report(cache: ResponseCache | None = None):
     """
     Retrieves an anime report by combining recently added and standard reports for anime.
     """
@@ -119,9 +146,11 @@ def get_anime_report():
     recently_added_data = _get_common_data(
         "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=148&nlist=all",
         category,
+        cache,
     )
     search_report_data = _get_search_data(
-        "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=155&nlist=all&type=anime"
+        "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=155&nlist=all&type=anime",
+        cache,
     )
 
     combined_data = _combine_search_data(recently_added_data, search_report_data)
@@ -129,7 +158,7 @@ def get_anime_report():
     return combined_data
 
 
-def get_manga_report():
+def get_manga_report(cache: ResponseCache | None = None):
     """
     Retrieves a manga report by combining recently added and standard reports for manga.
     """
@@ -137,9 +166,11 @@ def get_manga_report():
     recently_added_data = _get_common_data(
         "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=149&nlist=all",
         category,
+        cache,
     )
     search_report_data = _get_search_data(
-        "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=155&nlist=all&type=manga"
+        "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=155&nlist=all&type=manga",
+        cache,
     )
 
     combined_data = _combine_search_data(recently_added_data, search_report_data)
@@ -147,7 +178,7 @@ def get_manga_report():
     return combined_data
 
 
-def get_person_report():
+def get_person_report(cache: ResponseCache | None = None):
     """
     Retrieves a person report.
 
@@ -162,19 +193,20 @@ def get_person_report():
     initial_people_data = _get_common_data(
         "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=150&nlist=1",
         category,
+        cache,
     )
 
-    people_data = []
+    people_data: list[dict] = []
     approximate_amount_of_people = int(initial_people_data[0]["id"])
     for offset in range(0, approximate_amount_of_people, batch_size):
         time.sleep(1)
         url = f"https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=150&nlist=50000&nskip={offset}"
-        people_data = people_data + _get_common_data(url, category)
+        people_data = people_data + _get_common_data(url, category, cache)
 
     return people_data
 
 
-def get_company_report():
+def get_company_report(cache: ResponseCache | None = None):
     """
     Retrieves a company report.
     """
@@ -182,6 +214,7 @@ def get_company_report():
     company_data = _get_common_data(
         "https://www.animenewsnetwork.com/encyclopedia/reports.xml?id=151&nlist=all",
         category,
+        cache,
     )
 
     return company_data
@@ -192,7 +225,6 @@ def _get_text(element, tag, default=None):
     return found.text if found is not None else default
 
 
-@logger.catch(reraise=True)
 @click.command(
     context_settings={"help_option_names": ["-h", "--help"]},
     epilog="Repository: https://github.com/ToshY/anime-news-network-encyclopedia",
@@ -216,33 +248,73 @@ def _get_text(element, tag, default=None):
     show_default=True,
     help="Retrieve report for specified category.",
 )
-def cli(output_directory, category):
+@click.option(
+    "--cache-directory",
+    type=click.Path(exists=False, file_okay=False, dir_okay=True, resolve_path=True),
+    required=False,
+    multiple=False,
+    envvar="ANN_CACHE_DIRECTORY",
+    help="Path to the response cache directory. Responses are not cached if omitted.",
+)
+@click.option(
+    "--cache-ttl",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=86400,
+    show_default=True,
+    help="Amount of seconds a cached response is used before it is retrieved again.",
+)
+@click.option(
+    "--cache-max-size",
+    type=click.IntRange(1),
+    required=False,
+    multiple=False,
+    default=512,
+    show_default=True,
+    help="Maximum size of the response cache in MB.",
+)
+@click.option(
+    "--replay",
+    "--offline",
+    "replay",
+    is_flag=True,
+    default=False,
+    help="Only use cached responses, without network access.",
+)
+@logger.catch(reraise=True, exclude=click.ClickException)
+def cli(output_directory, category, cache_directory, cache_ttl, cache_max_size, replay):
+    """
+    Retrieve reports for the specified category, or for all categories.
+    """
+
+    cache = get_response_cache(cache_directory, cache_ttl, cache_max_size, replay)
     output_directory = Path(click.format_filename(output_directory))
 
     if category is None:
         # Sleep to prevent API rate batch_size
-        anime_data = get_anime_report()
+        anime_data = get_anime_report(cache)
         report_category_output_directory = _get_report_directory(
             output_directory, "anime"
         )
         _save_json(anime_data, report_category_output_directory, "anime")
         time.sleep(1)
 
-        manga_data = get_manga_report()
+        manga_data = get_manga_report(cache)
         report_category_output_directory = _get_report_directory(
             output_directory, "manga"
         )
         _save_json(manga_data, report_category_output_directory, "manga")
         time.sleep(1)
 
-        company_data = get_company_report()
+        company_data = get_company_report(cache)
         report_category_output_directory = _get_report_directory(
             output_directory, "company"
         )
         _save_json(company_data, report_category_output_directory, "company")
         time.sleep(1)
 
-        person_data = get_person_report()
+        person_data = get_person_report(cache)
         report_category_output_directory = _get_report_directory(
             output_directory, "person"
         )
@@ -252,25 +324,25 @@ def cli(output_directory, category):
 
     match category.lower():
         case "anime":
-            data = get_anime_report()
+            data = get_anime_report(cache)
             report_category_output_directory = _get_report_directory(
                 output_directory, category
             )
             _save_json(data, report_category_output_directory, category)
         case "manga":
-            data = get_manga_report()
+            data = get_manga_report(cache)
             report_category_output_directory = _get_report_directory(
                 output_directory, category
             )
             _save_json(data, report_category_output_directory, category)
         case "person":
-            data = get_person_report()
+            data = get_person_report(cache)
             report_category_output_directory = _get_report_directory(
                 output_directory, category
             )
             _save_json(data, report_category_output_directory, category)
         case "company":
-            data = get_company_report()
+            data = get_company_report(cache)
             report_category_output_directory = _get_report_directory(
                 output_directory, category
             )
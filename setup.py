@@ -43,6 +43,7 @@ setup(
         "console_scripts": [
             "report_updater=report_updater.cli:cli",
             "encyclopedia_updater=encyclopedia_updater.cli:cli",
+            "ann_encyclopedia=ann_encyclopedia.cli:cli",
         ],
     },
     install_requires=parse_requirements("requirements.txt"),